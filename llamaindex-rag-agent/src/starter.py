@@ -1,5 +1,6 @@
 import asyncio
 import pathlib
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from llama_index.core import (
@@ -10,24 +11,33 @@ from llama_index.core import (
     load_index_from_storage,
 )
 from llama_index.core.agent.workflow import AgentWorkflow
+from llama_index.core.base.base_query_engine import BaseQueryEngine
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.anthropic import Anthropic
 
-load_dotenv()
 
-Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-base-en-v1.5")
-Settings.llm = Anthropic(model="claude-3-haiku-20240307")
+@lru_cache(maxsize=1)
+def _llm() -> Anthropic:
+    """Create the Anthropic LLM shared by the agent and the query engine."""
+    load_dotenv()
+    return Anthropic(model="claude-3-haiku-20240307")
 
 
-# Create a RAG tool using LlamaIndex
-if not pathlib.Path("storage").exists():
-    documents = SimpleDirectoryReader("data").load_data()
-    index = VectorStoreIndex.from_documents(documents)
-    index.storage_context.persist("storage")
+@lru_cache(maxsize=1)
+def _query_engine() -> BaseQueryEngine:
+    """Build (or load from storage) the vector index on first use.
 
-storage_context = StorageContext.from_defaults(persist_dir="storage")
-index = load_index_from_storage(storage_context)
-query_engine = index.as_query_engine()
+    Blocking: call it once via asyncio.to_thread before running the agent.
+    """
+    Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-base-en-v1.5")
+
+    if not pathlib.Path("storage").exists():
+        documents = SimpleDirectoryReader("data").load_data()
+        VectorStoreIndex.from_documents(documents).storage_context.persist("storage")
+
+    storage_context = StorageContext.from_defaults(persist_dir="storage")
+    index = load_index_from_storage(storage_context)
+    return index.as_query_engine(llm=_llm())
 
 
 def multiply(a: float, b: float) -> float:
@@ -37,21 +47,25 @@ def multiply(a: float, b: float) -> float:
 
 async def search_documents(query: str) -> str:
     """Useful for answering natural language questions about an personal essay written by Paul Graham."""
-    response = await query_engine.aquery(query)
+    response = await _query_engine().aquery(query)
     return str(response)
 
 
-# Create an enhanced workflow with both tools
-agent = AgentWorkflow.from_tools_or_functions(
-    [multiply, search_documents],
-    llm=Settings.llm,
-    system_prompt="""You are a helpful assistant that can perform calculations
+def build_agent() -> AgentWorkflow:
+    """Create a workflow agent with both the calculator and search tools."""
+    return AgentWorkflow.from_tools_or_functions(
+        [multiply, search_documents],
+        llm=_llm(),
+        system_prompt="""You are a helpful assistant that can perform calculations
     and search through documents to answer questions.""",
-)
+    )
 
 
 # Now we can ask questions about the documents or do calculations
-async def main():
+async def main() -> None:
+    agent = build_agent()
+    # Build the index off the event loop once, before tool calls run concurrently
+    await asyncio.to_thread(_query_engine)
     response = await agent.run("What did the author do in college? Also, what's 7 * 8?")
     print(response)
 